@@ -2,6 +2,11 @@ import re
 import sys
 import os
 
+# Leading whitespace on each line, without consuming the line breaks
+_LEADING_WS_RE = re.compile(r'^[^\S\r\n]+', re.MULTILINE)
+# Characters that are invalid in filenames, deleted via str.translate
+_INVALID_FILENAME_CHARS = str.maketrans('', '', '<>:"/\\|?*')
+
 def Invoke(*args, **kwargs):
     try:
         # Extract the markdown content from the arguments
@@ -14,10 +19,10 @@ def Invoke(*args, **kwargs):
         
         # Use the title as the filename, removing the markdown header
         # Sanitize the filename to remove invalid characters
-        filename = re.sub(r'[<>:"/\\|?*]', '', title_line[2:].strip()) + '.md'
+        filename = title_line[2:].strip().translate(_INVALID_FILENAME_CHARS) + '.md'
         
         # Remove leading spaces from each line to fix markdown formatting
-        formatted_content = '\n'.join(line.lstrip() for line in markdown_content.splitlines())
+        formatted_content = _LEADING_WS_RE.sub('', markdown_content)
         
         # Determine the directory for saving the file
         summarizations_dir = os.getenv('SUMMARIZATIONS_DIR', os.path.join(os.getcwd(), 'Summarizations'))
@@ -26,9 +31,17 @@ def Invoke(*args, **kwargs):
         os.makedirs(summarizations_dir, exist_ok=True)
         
         # Save the content to a markdown file in the Summarizations directory
+        # Write to a temp file first and swap it in, so a failed write never leaves a partial note
         file_path = os.path.join(summarizations_dir, filename)
-        with open(file_path, 'w', encoding='utf-8') as file:
-            file.write(formatted_content)
+        tmp_path = file_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                file.write(formatted_content)
+            os.replace(tmp_path, file_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
         
         return "True"
     except Exception as e:
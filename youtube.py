@@ -1,237 +1,310 @@
 import re
 import os
+import bisect
+import shutil
 import tempfile
 import subprocess
+import concurrent.futures
+import functools
 import requests
-from typing import List, Tuple, Optional
+from requests.adapters import HTTPAdapter
+from typing import Iterable, Iterator, List, Tuple, Optional
 
 import json
 
+_URL_RE = re.compile(r'https?://[^\s]+')
+# Patterns to match YouTube URLs
+_YT_ID_RES = (
+    re.compile(r'(?:v=|\/)([0-9A-Za-z_-]{11})(?:[&?\/]|$)'),
+    re.compile(r'youtu\.be\/([0-9A-Za-z_-]{11})'),
+)
+_SRT_BLOCK_RE = re.compile(r'\n\s*\n')
+_SRT_TIME_RE = re.compile(r'(\d{2}:\d{2}:\d{2},\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2},\d{3})')
+# Single timestamps: VTT is [HH:]MM:SS.mmm, SRT is HH:MM:SS,mmm
+_VTT_TIMESTAMP_RE = re.compile(r'(?:(\d+):)?(\d+):(\d+)(?:\.(\d{3}))?')
+_SRT_TIMESTAMP_RE = re.compile(r'(\d+):(\d+):(\d+),(\d{3})')
+# Inline cue markup: <...> timing/style tags and named HTML entities
+_MARKUP_RE = re.compile(r"<[^>]+>|&[a-zA-Z]+;")
+
+# Shared session so repeated calls reuse pooled keep-alive connections
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+@functools.lru_cache(maxsize=512)
+def _fetch_oembed(url: str) -> Tuple[str, str]:
+    # Failures raise, so only successful lookups are cached
+    oembed_url = f"https://www.youtube.com/oembed?url={url}&format=json"
+    resp = _SESSION.get(oembed_url, timeout=10)
+    resp.raise_for_status()
+    data = resp.json()
+    title = data.get("title", "Unknown Title")
+    channel = data.get("author_name", "Unknown Channel")
+    return title, channel
+
 def get_video_title_and_channel(url: str):
     """
     Fetches the video title and channel name using YouTube's oEmbed API.
     Returns (title, channel) or ("Unknown Title", "Unknown Channel") on failure.
     """
-    oembed_url = f"https://www.youtube.com/oembed?url={url}&format=json"
     try:
-        resp = requests.get(oembed_url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        title = data.get("title", "Unknown Title")
-        channel = data.get("author_name", "Unknown Channel")
-        return title, channel
+        return _fetch_oembed(url)
     except Exception:
         return "Unknown Title", "Unknown Channel"
 
 def extract_video_id(input_text: str) -> Optional[str]:
-    print("Extract the YouTube video ID from a potentially unsanitized input.")
+    """
+    Extract the YouTube video ID from a potentially unsanitized input.
+    """
     # Remove any leading or trailing whitespace
     input_text = input_text.strip()
     
     # Extract the URL from the input text
-    url_match = re.search(r'https?://[^\s]+', input_text)
+    url_match = _URL_RE.search(input_text)
     if url_match:
         url = url_match.group(0)
     else:
         return None
     
-    # Define patterns to match YouTube URLs
-    patterns = [
-        r'(?:v=|\/)([0-9A-Za-z_-]{11})(?:[&?\/]|$)',
-        r'youtu\.be\/([0-9A-Za-z_-]{11})'
-    ]
-    
     # Search for a YouTube URL in the extracted URL
-    for pattern in patterns:
-        match = re.search(pattern, url)
+    for pattern in _YT_ID_RES:
+        match = pattern.search(url)
         if match:
             return match.group(1)
     
     return None
 
-def get_sponsor_segments(video_id: str) -> List[Tuple[float, float]]:
-    print("Query SponsorBlock API for sponsor segments.")
+@functools.lru_cache(maxsize=1024)
+def _fetch_sponsor_segments(video_id: str) -> Tuple[Tuple[float, float], ...]:
+    # Failures raise, so only real answers are cached
     api_url = f'https://sponsor.ajay.app/api/skipSegments?videoID={video_id}'
+    resp = _SESSION.get(api_url, timeout=10)
+    # SponsorBlock answers 404 when a video has no segments
+    if resp.status_code == 404:
+        return ()
+    resp.raise_for_status()
+    data = resp.json()
+    return tuple(
+        (float(start), float(end))
+        for start, end in (entry['segment'] for entry in data)
+    )
+
+def get_sponsor_segments(video_id: str) -> Tuple[Tuple[float, float], ...]:
+    """
+    Query SponsorBlock API for sponsor segments.
+    Returns a tuple of (start, end) pairs, or an empty tuple on failure.
+    """
     try:
-        resp = requests.get(api_url, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        segments = []
-        for entry in data:
-            for seg in entry.get('segments', []):
-                start, end = seg
-                segments.append((float(start), float(end)))
-        return segments
+        return _fetch_sponsor_segments(video_id)
     except Exception:
-        return []
+        return ()
 
 def download_subtitles(url: str, out_dir: str) -> Optional[str]:
-    print("Download subtitles using yt-dlp. Returns path to subtitle file or None.")
-    # Try VTT first, then SRT
-    for ext in ['vtt', 'srt']:
-        out_path = os.path.join(out_dir, f'subs.{ext}')
-        cmd = [
-            'yt-dlp',
-            '--write-auto-sub',
-            '--sub-lang', 'en',
-            '--skip-download',
-            '--sub-format', ext,
-            '-o', out_path,
-            url
-        ]
-        try:
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            # yt-dlp outputs as subs.ext, but may append .en or .en-US
-            for fname in os.listdir(out_dir):
-                if fname.startswith('subs') and fname.endswith(f'.{ext}'):
-                    return os.path.join(out_dir, fname)
-        except Exception:
-            continue
+    """
+    Download subtitles using yt-dlp. Returns path to subtitle file or None.
+    """
+    # YouTube auto-subs are always available as VTT, so a single yt-dlp run is enough
+    out_path = os.path.join(out_dir, 'subs.vtt')
+    cmd = [
+        'yt-dlp',
+        '--write-auto-sub',
+        '--sub-lang', 'en',
+        '--skip-download',
+        '--sub-format', 'vtt',
+        # Report where the subtitle file was written; --print implies
+        # --simulate, so --no-simulate is needed for it to be written at all
+        '--no-simulate',
+        '--print', 'after_video:requested_subtitles.en.filepath',
+        '-o', out_path,
+        url
+    ]
+    try:
+        result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    except Exception:
+        return None
+    sub_path = result.stdout.strip()
+    if sub_path and os.path.isfile(sub_path):
+        return sub_path
+    # yt-dlp outputs as subs.vtt, but may append .en or .en-US
+    for fname in os.listdir(out_dir):
+        if fname.startswith('subs') and fname.endswith('.vtt'):
+            return os.path.join(out_dir, fname)
     return None
 
-def parse_vtt(path: str) -> List[Tuple[float, float, str]]:
-    print("Parse WebVTT file and return list of (start, end, text) cues.")
-    cues = []
+def _clean_cue(text: str) -> str:
+    """
+    Strip tags and HTML entities from a cue and collapse whitespace.
+    """
+    return " ".join(_MARKUP_RE.sub("", text).split())
+
+def parse_vtt(path: str) -> Iterator[Tuple[float, float, str]]:
+    """
+    Parse WebVTT file and yield (start, end, text) cues with cleaned text.
+    """
     with open(path, encoding='utf-8') as f:
-        lines = f.readlines()
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        if '-->' in line:
-            times = line.split('-->')
-            start = vtt_time_to_seconds(times[0].strip())
-            end = vtt_time_to_seconds(times[1].strip())
-            i += 1
+        # Text lines are pulled from the same iterator, so the file is streamed
+        lines = iter(f)
+        for line in lines:
+            if '-->' not in line:
+                continue
+            start_str, _, end_str = line.partition('-->')
+            start = vtt_time_to_seconds(start_str.strip())
+            end = vtt_time_to_seconds(end_str.strip())
             text_lines = []
-            while i < len(lines) and lines[i].strip() and '-->' not in lines[i]:
-                text_lines.append(lines[i].strip())
-                i += 1
-            text = ' '.join(text_lines).strip()
+            for text_line in lines:
+                text_line = text_line.strip()
+                if not text_line or '-->' in text_line:
+                    break
+                text_lines.append(text_line)
+            text = _clean_cue(' '.join(text_lines))
             if text:
-                cues.append((start, end, text))
-        i += 1
-    return cues
+                yield start, end, text
 
 def vtt_time_to_seconds(t: str) -> float:
-    # Format: HH:MM:SS.mmm or MM:SS.mmm
-    parts = t.split(':')
-    if len(parts) == 3:
-        h, m, s = parts
-    elif len(parts) == 2:
-        h = 0
-        m, s = parts
-    else:
+    # Format: HH:MM:SS.mmm or MM:SS.mmm, possibly followed by cue settings
+    match = _VTT_TIMESTAMP_RE.match(t)
+    if not match:
         return 0.0
-    s, *ms = s.split('.')
-    ms = ms[0] if ms else '0'
-    total = int(h) * 3600 + int(m) * 60 + int(s) + float(f'0.{ms}')
-    return total
+    h, m, s, ms = match.groups()
+    total_ms = (int(h or 0) * 3600 + int(m) * 60 + int(s)) * 1000 + int(ms or 0)
+    return total_ms / 1000.0
 
 def parse_srt(path: str) -> List[Tuple[float, float, str]]:
-    print("Parse SRT file and return list of (start, end, text) cues.")
+    """
+    Parse SRT file and return list of (start, end, text) cues with cleaned text.
+    """
     cues = []
     with open(path, encoding='utf-8') as f:
         content = f.read()
-    blocks = re.split(r'\\n\\s*\\n', content)
+    blocks = _SRT_BLOCK_RE.split(content)
     for block in blocks:
         lines = block.strip().splitlines()
         if len(lines) >= 2:
             # First line: index, Second line: time, Rest: text
             time_line = lines[1]
-            match = re.match(r'(\\d{2}:\\d{2}:\\d{2},\\d{3})\\s*-->\\s*(\\d{2}:\\d{2}:\\d{2},\\d{3})', time_line)
+            match = _SRT_TIME_RE.match(time_line)
             if match:
                 start = srt_time_to_seconds(match.group(1))
                 end = srt_time_to_seconds(match.group(2))
-                text = ' '.join(l.strip() for l in lines[2:] if l.strip())
+                text = _clean_cue(' '.join(lines[2:]))
                 if text:
                     cues.append((start, end, text))
     return cues
 
 def srt_time_to_seconds(t: str) -> float:
-    print("Format: HH:MM:SS,mmm")
     # Format: HH:MM:SS,mmm
-    h, m, s_ms = t.split(':')
-    s, ms = s_ms.split(',')
-    total = int(h) * 3600 + int(m) * 60 + int(s) + float(f'0.{ms}')
-    return total
+    match = _SRT_TIMESTAMP_RE.match(t)
+    if not match:
+        return 0.0
+    h, m, s, ms = match.groups()
+    total_ms = (int(h) * 3600 + int(m) * 60 + int(s)) * 1000 + int(ms)
+    return total_ms / 1000.0
 
-def cues_overlap(cue_start: float, cue_end: float, segments: List[Tuple[float, float]]) -> bool:
-    for seg_start, seg_end in segments:
-        if cue_end > seg_start and cue_start < seg_end:
-            return True
-    return False
+def merge_segments(segments: Iterable[Tuple[float, float]]) -> Tuple[List[float], List[float]]:
+    """
+    Sort sponsor segments and merge overlapping ones.
+    Returns (starts, ends); both are ascending, so they can be bisected.
+    """
+    starts = []
+    ends = []
+    for seg_start, seg_end in sorted(segments):
+        if ends and seg_start < ends[-1]:
+            ends[-1] = max(ends[-1], seg_end)
+        else:
+            starts.append(seg_start)
+            ends.append(seg_end)
+    return starts, ends
+
+def cues_overlap(cue_start: float, cue_end: float, seg_starts: List[float], seg_ends: List[float]) -> bool:
+    # Of the segments starting before the cue ends, the last one reaches furthest
+    i = bisect.bisect_left(seg_starts, cue_end)
+    return i > 0 and seg_ends[i - 1] > cue_start
+
+def _overlap_len(prev: str, cur: str) -> int:
+    """
+    Length of the longest suffix of prev that is also a prefix of cur.
+    """
+    if not prev or not cur:
+        return 0
+    # A matching suffix must start with cur's first character, so only those
+    # positions are compared, longest candidate first
+    first = cur[0]
+    pos = prev.find(first, max(0, len(prev) - len(cur)))
+    while pos != -1:
+        if cur.startswith(prev[pos:]):
+            return len(prev) - pos
+        pos = prev.find(first, pos + 1)
+    return 0
 
-def deduplicate_cues(cues: List[Tuple[float, float, str]]) -> List[str]:
+def deduplicate_cues(cues: Iterable[Tuple[float, float, str]]) -> List[str]:
     """
-    Deduplicate overlapping/consecutive fragments using a sliding window,
-    stripping tags and HTML entities before deduplication.
+    Deduplicate overlapping/consecutive fragments using a sliding window.
+    Expects cue text already cleaned by parse_vtt/parse_srt.
     """
     deduped = []
     prev = ""
-    for _, _, text in cues:
-        # Remove tags
-        cue_text = re.sub(r"<[^>]+>", "", text)
-        # Remove HTML entities
-        cue_text = re.sub(r"&[a-zA-Z]+;", "", cue_text)
-        # Remove extra whitespace
-        cue_text = " ".join(cue_text.strip().split())
+    for _, _, cue_text in cues:
         if not cue_text:
             continue
         # Sliding window overlap removal
-        overlap = 0
-        max_overlap = min(len(prev), len(cue_text))
-        for i in range(max_overlap, 0, -1):
-            if prev[-i:] == cue_text[:i]:
-                overlap = i
-                break
-        deduped.append(cue_text[overlap:] if overlap else cue_text)
+        overlap = _overlap_len(prev, cue_text)
+        # Trimming the overlap can leave the separating space at the front
+        remainder = cue_text[overlap:].lstrip() if overlap else cue_text
+        if remainder:
+            deduped.append(remainder)
         prev = cue_text
-    return [t for t in deduped if t]
+    return deduped
 
 def extract_transcript(url: str) -> str:
     video_id = extract_video_id(url)
     if not video_id:
         raise ValueError('Could not extract video ID from URL')
-    sponsor_segments = get_sponsor_segments(video_id)
     # Construct the YouTube URL from the video_id
     constructed_url = f"https://www.youtube.com/watch?v={video_id}"
     
-    # Fetch title and channel using the constructed URL
-    title, channel = get_video_title_and_channel(constructed_url)
-    with tempfile.TemporaryDirectory() as tmpdir:
-        sub_path = download_subtitles(constructed_url, tmpdir)
-        if not sub_path:
-            raise RuntimeError('Could not download subtitles')
-        if sub_path.endswith('.vtt'):
+    tmpdir = tempfile.mkdtemp()
+    sub_path = None
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+            # The SponsorBlock, oEmbed and yt-dlp requests are independent, so run them concurrently
+            segments_future = executor.submit(get_sponsor_segments, video_id)
+            meta_future = executor.submit(get_video_title_and_channel, constructed_url)
+            subs_future = executor.submit(download_subtitles, constructed_url, tmpdir)
+            sub_path = subs_future.result()
+            if not sub_path:
+                raise RuntimeError('Could not download subtitles')
+            # Cues are parsed, cleaned, filtered and deduplicated in one streaming pass
             cues = parse_vtt(sub_path)
-        elif sub_path.endswith('.srt'):
-            cues = parse_srt(sub_path)
-        else:
-            raise RuntimeError('Unknown subtitle format')
-        # Filter out sponsor cues
-        filtered = [
-            (start, end, text)
-            for (start, end, text) in cues
-            if not cues_overlap(start, end, sponsor_segments)
-        ]
-        deduped = deduplicate_cues(filtered)
-        # Remove all <...> tags and HTML entities from each line, collapse whitespace, and join into a single string
-        cleaned = []
-        for line in deduped:
-            # Remove tags
-            line = re.sub(r"<[^>]+>", "", line)
-            # Remove HTML entities
-            line = re.sub(r"&[a-zA-Z]+;", "", line)
-            # Collapse whitespace
-            line = " ".join(line.strip().split())
-            if line:
-                cleaned.append(line)
-        transcript = " ".join(cleaned)
-        prefix = f"{title} by {channel}:\n\n"
-        return prefix + transcript.strip()
+            # Filter out sponsor cues; most videos have none, so skip the per-cue check then
+            sponsor_segments = segments_future.result()
+            if sponsor_segments:
+                seg_starts, seg_ends = merge_segments(sponsor_segments)
+                cues = (
+                    (start, end, text)
+                    for (start, end, text) in cues
+                    if not cues_overlap(start, end, seg_starts, seg_ends)
+                )
+            deduped = deduplicate_cues(cues)
+            title, channel = meta_future.result()
+            prefix = f"{title} by {channel}:\n\n"
+            if not deduped:
+                return prefix
+            # Fold the prefix into the first fragment so the result is built by a single join
+            deduped[0] = prefix + deduped[0]
+            return " ".join(deduped)
+    finally:
+        # yt-dlp normally leaves only the subtitle file behind, so remove it and the
+        # directory directly; walk the tree only if something else was written
+        try:
+            if sub_path:
+                os.remove(sub_path)
+            os.rmdir(tmpdir)
+        except OSError:
+            shutil.rmtree(tmpdir, ignore_errors=True)
 
 def Invoke(*args, **kwargs):
-    print(f"Entrypoint: Invoke({args}) -> transcript string")
+    """
+    Entrypoint: Invoke(url) -> transcript string
+    """
     if args:
         url = args[0]
     else: